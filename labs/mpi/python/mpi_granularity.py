@@ -8,9 +8,9 @@ Show why MPI parallelism helps only when each task is "big enough".
 
 Model
 -----
-- Rank 0 creates a list of NTASKS identical tasks.
-- Tasks are broadcast to all ranks.
-- Each rank takes a round-robin slice of tasks (rank::size).
+- Rank 0 creates NTASKS identical task IDs (an int32 NumPy array).
+- MPI_Scatterv sends each rank only its contiguous block of IDs
+  (block sizes differ by at most 1; no pickling, no per-rank slicing).
 - Each task is simulated by time.sleep(--sleep).
 - Results are gathered and a wall-time is reported.
 
@@ -32,6 +32,7 @@ from __future__ import annotations
 import argparse
 import time
 
+import numpy as np
 from mpi4py import MPI
 
 
@@ -45,13 +46,14 @@ def main() -> None:
     rank = comm.Get_rank()
     size = comm.Get_size()
 
-    if rank == 0:
-        tasks = list(range(args.tasks))
-    else:
-        tasks = None
+    # Contiguous block per rank; the first (NTASKS % size) ranks get one extra.
+    counts = np.full(size, args.tasks // size, dtype=np.int32)
+    counts[: args.tasks % size] += 1
+    displs = np.cumsum(counts) - counts
 
-    tasks = comm.bcast(tasks, root=0)
-    my_tasks = tasks[rank::size]
+    ids = np.arange(args.tasks, dtype=np.int32) if rank == 0 else None
+    my_tasks = np.empty(counts[rank], dtype=np.int32)
+    comm.Scatterv([ids, counts, displs, MPI.INT] if rank == 0 else None, my_tasks, root=0)
 
     comm.Barrier()
     t0 = time.perf_counter()
@@ -63,10 +65,13 @@ def main() -> None:
     t1 = time.perf_counter()
 
     my_done = len(my_tasks)
-    all_done = comm.gather(my_done, root=0)
+    # Typed buffers use MPI's datatype path instead of pickling Python ints.
+    sendbuf = np.array([my_done], dtype=np.int64)
+    all_done = np.empty(size, dtype=np.int64) if rank == 0 else None
+    comm.Gather(sendbuf, all_done, root=0)
 
     if rank == 0:
-        done = sum(all_done)
+        done = int(all_done.sum())
         wall = t1 - t0
         print(f"ranks={size} tasks={done} sleep={args.sleep:.6f}s wall={wall:.6f}s tasks_per_s={done/wall:.1f}")
 
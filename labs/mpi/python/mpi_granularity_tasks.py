@@ -16,6 +16,14 @@ Model
 - Tasks are assigned round-robin: task_ids = range(rank, ntasks, size)
 - Each task performs deterministic CPU work for WORK iterations (no sleep).
 
+Dynamic scheduling (--schedule dynamic)
+---------------------------------------
+Instead of the static round-robin split, rank 0 acts as a master that hands out
+task IDs on demand (workers send REQ, master replies with the next task ID or
+NO_MORE_TASKS), like the token server in mpi_shared_resource.py. This balances
+uneven task costs / OS jitter at the price of one message round-trip per task.
+Rank 0 does no tasks itself, so this needs >= 2 ranks.
+
 Optional coordination overhead
 -----------------------------
 Real MPI apps often synchronize periodically (reductions, halo exchange, etc.).
@@ -43,7 +51,10 @@ mpirun -np 8 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --wor
 mpirun -np 1 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --work 20
 mpirun -np 8 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --work 20
 
-# 3) Force a clear knee on a laptop (periodic sync)
+# 3) Static vs dynamic (master-worker) scheduling
+mpirun -np 4 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --work 2000 --schedule dynamic
+
+# 4) Force a clear knee on a laptop (periodic sync)
 mpirun -np 1 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --work 10 --sync-every 2
 mpirun -np 2 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --work 10 --sync-every 2
 mpirun -np 4 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --work 10 --sync-every 2
@@ -51,6 +62,8 @@ mpirun -np 8 python labs/mpi/python/mpi_granularity_tasks.py --ntasks 2000 --wor
 
 Notes for laptops
 -----------------
+- If Numba is installed, cpu_work is JIT-compiled; otherwise it runs as plain
+  Python (same results, but much heavier per unit of --work).
 - If you run more ranks than physical cores, you may see slowdown from oversubscription.
 - Single runs are noisy; this script uses warmup + reps and reports median makespan.
 """
@@ -58,16 +71,38 @@ Notes for laptops
 from __future__ import annotations
 
 import argparse
-import time
+from functools import partial
+
 import numpy as np
 from mpi4py import MPI
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; fall back to the plain Python loop.
+    def njit(*_args, **_kwargs):
+        return lambda fn: fn
+
+
+# Message tags for --schedule dynamic (worker <-> master on rank 0)
+TAG_REQ = 20       # worker -> master: give me a task (payload ignored)
+TAG_TASK = 21      # master -> worker: task ID, or NO_MORE_TASKS
+NO_MORE_TASKS = -1
+
+# Every rep's accumulator is XOR-ed in here, so the work escapes the rep loop and
+# cannot be treated as dead code (even once cpu_work is JIT-compiled).
+_sink = np.zeros(1, dtype=np.int64)
 
+
+@njit(cache=True, boundscheck=False)
 def cpu_work(work: int, seed: int) -> int:
     """
     Deterministic CPU-only "work" that avoids sleep() and avoids BLAS threads.
     Uses a simple integer LCG update loop.
 
+    JIT-compiled with Numba when available, so a task costs real compute rather
+    than CPython bytecode dispatch. The explicit 32-bit mask keeps results
+    identical in both modes (int64 arithmetic never overflows here).
+
     Returns an integer accumulator (prevents the loop being optimized away).
     """
     x = seed & 0xFFFFFFFF
@@ -76,6 +111,57 @@ def cpu_work(work: int, seed: int) -> int:
     return x
 
 
+def cpu_work_batch(work: int, seeds: np.ndarray) -> int:
+    """
+    Vectorized cpu_work over a batch of tasks: the same LCG, applied to an
+    array of per-task seeds at once (one Python-level loop of length WORK
+    instead of one cpu_work call per task).
+
+    uint32 arithmetic wraps mod 2**32, matching the 32-bit mask in cpu_work.
+    Returns the XOR of all final states (same as XOR-ing cpu_work per task).
+    """
+    x = (seeds & 0xFFFFFFFF).astype(np.uint32)
+    a = np.uint32(1664525)
+    c = np.uint32(1013904223)
+    for _ in range(work):
+        x *= a
+        x += c
+    return int(np.bitwise_xor.reduce(x)) if x.size else 0
+
+
+def dynamic_master(comm: MPI.Comm, ntasks: int, buf: np.ndarray, status: MPI.Status) -> None:
+    """
+    Rank 0 in --schedule dynamic: hand out task IDs 0..ntasks-1 first-come,
+    first-served, then answer each worker once with NO_MORE_TASKS.
+    """
+    next_id = 0
+    active = comm.Get_size() - 1
+    while active > 0:
+        comm.Recv(buf, source=MPI.ANY_SOURCE, tag=TAG_REQ, status=status)
+        if next_id < ntasks:
+            buf[0] = next_id
+            next_id += 1
+        else:
+            buf[0] = NO_MORE_TASKS
+            active -= 1
+        comm.Send(buf, dest=status.Get_source(), tag=TAG_TASK)
+
+
+def dynamic_worker(comm: MPI.Comm, work: int, seed_base: int, buf: np.ndarray) -> int:
+    """
+    Worker in --schedule dynamic: request tasks until NO_MORE_TASKS.
+    Returns the XOR accumulator of the tasks this rank ran.
+    """
+    acc = 0
+    while True:
+        comm.Send(buf, dest=0, tag=TAG_REQ)
+        comm.Recv(buf, source=0, tag=TAG_TASK)
+        tid = int(buf[0])
+        if tid == NO_MORE_TASKS:
+            return acc
+        acc ^= cpu_work(work, seed=seed_base + tid)
+
+
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--ntasks", type=int, default=2000, help="Total tasks (global), distributed across ranks")
@@ -84,54 +170,108 @@ def main() -> None:
     ap.add_argument("--reps", type=int, default=25, help="Measured repetitions")
     ap.add_argument("--warmup", type=int, default=5, help="Warmup repetitions")
     ap.add_argument("--seed", type=int, default=1234, help="Deterministic seed base")
+    ap.add_argument("--kernel", choices=("loop", "numpy"), default="loop",
+                    help="Per-task cpu_work calls, or one vectorized NumPy LCG over all of this rank's tasks")
+    ap.add_argument("--schedule", choices=("static", "dynamic"), default="static",
+                    help="Static round-robin split, or master (rank 0) hands out task IDs on demand")
     args = ap.parse_args()
 
     comm = MPI.COMM_WORLD
     rank = comm.Get_rank()
     size = comm.Get_size()
 
+    if args.schedule == "dynamic":
+        if size < 2:
+            raise SystemExit("--schedule dynamic needs >= 2 ranks (master rank 0 + workers)")
+        if args.sync_every > 0 or args.kernel != "loop":
+            raise SystemExit("--schedule dynamic supports only --sync-every 0 and --kernel loop")
+
+    # 1-int buffer + status for the dynamic scheduling protocol.
+    task_buf = np.zeros(1, dtype=np.int64)
+    status = MPI.Status()
+
     # Round-robin slice without broadcasting a Python list (keeps the lab about scaling).
     task_ids = range(rank, args.ntasks, size)
     my_ntasks = len(range(rank, args.ntasks, size))
+    task_id_arr = np.arange(rank, args.ntasks, size, dtype=np.int64)  # for --kernel numpy
 
-    rep_times = []
+    rep_times = np.empty(args.reps, dtype=np.float64)
 
     # Used for the optional sync (keep tiny payload).
     sync_val = np.array([rank], dtype=np.int64)
     sync_out = np.array([0], dtype=np.int64)
 
+    # Bind the sync once. With an MPI-4 library, a persistent Allreduce_init
+    # request is set up once and each sync is just Start + Wait; otherwise a
+    # pre-bound comm.Allreduce (no per-call attribute/argument lookups).
+    try:
+        sync_req = comm.Allreduce_init(sync_val, sync_out, op=MPI.SUM)
+    except (AttributeError, NotImplementedError):
+        sync_req = None
+    if sync_req is not None:
+        def do_sync() -> None:
+            sync_req.Start()
+            sync_req.Wait()
+    else:
+        do_sync = partial(comm.Allreduce, sync_val, sync_out, MPI.SUM)
+
+    # First call pays JIT compilation (or cache load); keep it out of the reps.
+    cpu_work(1, args.seed)
+
     for rep in range(args.warmup + args.reps):
         comm.Barrier()
-        t0 = time.perf_counter()
+        t0 = MPI.Wtime()
 
         acc = 0
         since_sync = 0
 
-        for tid in task_ids:
-            acc ^= cpu_work(args.work, seed=args.seed + 100000 * rep + tid)
-            if args.sync_every > 0:
-                since_sync += 1
-                if since_sync >= args.sync_every:
-                    # Mimic periodic coordination/communication.
-                    comm.Allreduce(sync_val, sync_out, op=MPI.SUM)
-                    since_sync = 0
+        if args.schedule == "dynamic":
+            if rank == 0:
+                dynamic_master(comm, args.ntasks, task_buf, status)
+            else:
+                acc = dynamic_worker(comm, args.work, args.seed + 100000 * rep, task_buf)
+        elif args.kernel == "numpy":
+            # Same tasks and sync points, but each block of tasks between syncs
+            # (or all of them, without sync) is one vectorized batch.
+            seeds = task_id_arr + (args.seed + 100000 * rep)
+            block = args.sync_every if args.sync_every > 0 else max(my_ntasks, 1)
+            for lo in range(0, my_ntasks, block):
+                acc ^= cpu_work_batch(args.work, seeds[lo:lo + block])
+                if args.sync_every > 0 and lo + block <= my_ntasks:
+                    do_sync()
+        else:
+            for tid in task_ids:
+                acc ^= cpu_work(args.work, seed=args.seed + 100000 * rep + tid)
+                if args.sync_every > 0:
+                    since_sync += 1
+                    if since_sync >= args.sync_every:
+                        # Mimic periodic coordination/communication.
+                        do_sync()
+                        since_sync = 0
 
         # One last tiny sync so that rep end is comparable across ranks.
         comm.Barrier()
-        t1 = time.perf_counter()
+        t1 = MPI.Wtime()
 
-        _ = acc  # keep "used"
+        _sink[0] ^= acc
         if rep >= args.warmup:
-            rep_times.append(t1 - t0)
+            rep_times[rep - args.warmup] = t1 - t0
 
-    rep_times = np.array(rep_times, dtype=float)
+    if sync_req is not None:
+        sync_req.Free()
 
     # Gather per-rank time series so rank 0 can compute makespan per repetition.
-    all_rep_times = comm.gather(rep_times, root=0)
+    # Buffer-mode Gather: one row per rank, no pickling of the arrays.
+    all_rep_times = np.empty((size, args.reps), dtype=np.float64) if rank == 0 else None
+    comm.Gather(rep_times, all_rep_times, root=0)
+
+    # Global checksum of all task results: independent of ranks/schedule/kernel.
+    checksum = np.zeros(1, dtype=np.int64) if rank == 0 else None
+    comm.Reduce(_sink, checksum, op=MPI.BXOR, root=0)
 
     if rank == 0:
         # makespan per rep = max over ranks (what wall time "feels like")
-        makespans = np.max(np.vstack(all_rep_times), axis=0)
+        makespans = np.max(all_rep_times, axis=0)
         med = float(np.median(makespans))
         mn = float(np.min(makespans))
         p90_wall = np.percentile(makespans, 90)
@@ -139,9 +279,10 @@ def main() -> None:
         tasks_per_sec = args.ntasks / med if med > 0 else 0.0
 
         print(
-            f"ranks={size} ntasks={args.ntasks} work={args.work} sync_every={args.sync_every} "
+            f"ranks={size} ntasks={args.ntasks} work={args.work} sync_every={args.sync_every} kernel={args.kernel} "
+            f"schedule={args.schedule} "
             f"reps={args.reps} median_wall={med:.6f}s min_wall={mn:.6f}s p90_wall={p90_wall:.6f} "
-            f"tasks_per_sec={tasks_per_sec:.1f}"
+            f"tasks_per_sec={tasks_per_sec:.1f} checksum={int(checksum[0])}"
         )
 
 
@@ -8,16 +8,33 @@ Measure the *coordination cost* of an MPI collective (Bcast) as you add ranks.
 
 What it does
 ------------
-- Rank 0 allocates a payload buffer of size --mb.
+- Rank 0 allocates a payload buffer of size --mb (filled with a constant byte).
 - All ranks participate in comm.Bcast(payload) repeatedly.
-- We time a synchronized “collective step”:
-    Barrier -> Bcast -> Barrier
-
-Why the barriers?
-----------------
-They make each repetition start and end in a synchronized state, so the timing
-is a stable measure of “collective coordination” (not just raw Bcast kernel time).
-This is especially helpful on laptops where OS scheduling noise is significant.
+- One Barrier before the timed loop, then only the collective is timed:
+    Barrier -> [Bcast, Bcast, ...]   (each rank records its own per-rep time)
+- Per repetition, the makespan is the max over ranks; we report the median
+  (and min) of those per-rep makespans.
+
+Why not Barrier -> Bcast -> Barrier per rep?
+--------------------------------------------
+Barrier-bracketed timings measure barrier + collective, i.e. three collectives
+per rep, which inflates the reported "Bcast cost" by two barrier latencies
+(this dominates at small payloads). Taking the max over ranks per rep still
+gives a "how long did the collective step take" number without the barriers.
+
+--mode ibcast uses comm.Ibcast(...) + req.Wait() instead, and additionally
+reports the posting cost (time spent inside Ibcast itself).
+
+--mode persistent uses an MPI-4 persistent collective: comm.Bcast_init(...) once,
+then req.Start(); req.Wait() per rep, so the library can precompute the
+broadcast schedule and skip per-call argument handling. It also times plain
+Bcast in the same run and reports both medians. (Falls back to Bcast when the
+mpi4py/MPI library has no Bcast_init.)
+
+--mode shm (single node only) puts the payload in an MPI shared-memory window
+owned by rank 0; every rank reads it in place, so a rep is just one Win.Fence()
+synchronization and no data is copied. Compare with --mode bcast to separate
+"coordination cost" from "memcpy to N ranks".
 
 Expected behavior
 -----------------
@@ -29,15 +46,22 @@ Run examples
 mpirun -np 1 python labs/mpi/python/mpi_overhead_bcast.py --mb 16 --reps 100
 mpirun -np 2 python labs/mpi/python/mpi_overhead_bcast.py --mb 16 --reps 100
 mpirun -np 4 python labs/mpi/python/mpi_overhead_bcast.py --mb 16 --reps 100
+mpirun -np 4 python labs/mpi/python/mpi_overhead_bcast.py --mb 16 --reps 100 --mode shm
 """
 
 from __future__ import annotations
 
 import argparse
+import os
 import time
 
-import numpy as np
-from mpi4py import MPI
+# One thread per rank: avoid BLAS/OpenMP oversubscription when running e.g.
+# 8 ranks on an 8-core laptop (must be set before NumPy is imported).
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+
+import numpy as np  # noqa: E402 (thread env vars must be set before NumPy is imported)
+from mpi4py import MPI  # noqa: E402 (imported after the thread env vars, like NumPy)
 
 
 def main() -> None:
@@ -45,6 +69,12 @@ def main() -> None:
     ap.add_argument("--mb", type=float, default=16.0, help="Payload size in MB")
     ap.add_argument("--reps", type=int, default=100, help="Measured repetitions")
     ap.add_argument("--warmup", type=int, default=10, help="Warmup repetitions (not counted)")
+    ap.add_argument("--mode", choices=("bcast", "ibcast", "persistent", "shm"), default="bcast",
+                    help="Blocking Bcast, nonblocking Ibcast + Wait (splits post vs completion), "
+                         "persistent Bcast_init + Start/Wait (vs Bcast), "
+                         "or shared-memory window + Fence (single node)")
+    ap.add_argument("--timer", choices=("wtime", "ns"), default="wtime",
+                    help="MPI.Wtime (float seconds) or time.perf_counter_ns (int64 ns, converted at the end)")
     args = ap.parse_args()
 
     comm = MPI.COMM_WORLD
@@ -54,42 +84,126 @@ def main() -> None:
     nbytes = int(args.mb * 1024 * 1024)
 
     # Use uint8 to focus on communication rather than numeric kernels.
-    payload = np.empty(nbytes, dtype=np.uint8)
+    win = None
+    if args.mode == "shm":
+        shm = comm.Split_type(MPI.COMM_TYPE_SHARED)
+        if shm.Get_size() != size:
+            raise SystemExit("--mode shm needs all ranks on one node")
+        # Only rank 0 backs the window; everyone maps rank 0's segment.
+        win = MPI.Win.Allocate_shared(nbytes if rank == 0 else 0, 1, comm=shm)
+        buf, _ = win.Shared_query(0)
+        payload = np.ndarray(buffer=buf, dtype=np.uint8, shape=(nbytes,))
+    else:
+        payload = np.empty(nbytes, dtype=np.uint8)
+        payload.fill(0)  # pre-touch pages on every rank (first-touch is setup cost, not Bcast cost)
     if rank == 0:
-        payload[:] = np.random.randint(0, 256, size=nbytes, dtype=np.uint8)
+        # Content does not matter for the benchmark; one memset is far cheaper
+        # than generating random bytes (and touches every page as well).
+        payload.fill(0xA5)
+
+    mode = args.mode
+    preq = None
+    if mode == "persistent":
+        try:
+            preq = comm.Bcast_init(payload, root=0)
+        except (AttributeError, NotImplementedError):
+            if rank == 0:
+                print("Bcast_init not available (needs MPI-4 + mpi4py >= 4); using Bcast")
+            mode = "bcast"
+
+    # Setup is finished on all ranks before the first (warmup) Bcast.
+    comm.Barrier()
 
     # Warmup (not timed)
     for _ in range(args.warmup):
+        if win is not None:
+            win.Fence()
+        else:
+            comm.Bcast(payload, root=0)
+            if preq is not None:
+                preq.Start()
+                preq.Wait()
+
+    # Timer choice: MPI.Wtime is cheaper than time.perf_counter; the ns timer
+    # stores raw int64 ticks and defers the float conversion to the summary.
+    if args.timer == "ns":
+        clock, tdtype, scale = time.perf_counter_ns, np.int64, 1e-9
+    else:
+        clock, tdtype, scale = MPI.Wtime, np.float64, 1.0
+
+    times = np.empty(args.reps, dtype=tdtype)
+    post_times = np.zeros(args.reps, dtype=tdtype)
+    bcast_times = np.zeros(args.reps, dtype=tdtype)  # plain Bcast reference (persistent mode)
+
+    # Single synchronization, then only the collective is inside the timed loop.
+    comm.Barrier()
+    if mode == "bcast":
+        for i in range(args.reps):
+            t0 = clock()
+            comm.Bcast(payload, root=0)
+            times[i] = clock() - t0
+    elif mode == "persistent":
+        for i in range(args.reps):
+            t0 = clock()
+            comm.Bcast(payload, root=0)
+            bcast_times[i] = clock() - t0
         comm.Barrier()
-        comm.Bcast(payload, root=0)
-        comm.Barrier()
-
-    times = np.empty(args.reps, dtype=np.float64)
-
-    # Timed repetitions: Barrier -> Bcast -> Barrier
-    for i in range(args.reps):
-        comm.Barrier()
-        t0 = time.perf_counter()
-        comm.Bcast(payload, root=0)
-        comm.Barrier()
-        times[i] = time.perf_counter() - t0
-
-    # Gather per-rank timings so rank 0 can summarize
-    all_times = comm.gather(times, root=0)
+        for i in range(args.reps):
+            t0 = clock()
+            preq.Start()
+            preq.Wait()
+            times[i] = clock() - t0
+        preq.Free()
+    elif mode == "shm":
+        # Rank 0's writes become visible to all ranks at the fence; no copy.
+        for i in range(args.reps):
+            t0 = clock()
+            win.Fence()
+            times[i] = clock() - t0
+    else:
+        for i in range(args.reps):
+            t0 = clock()
+            req = comm.Ibcast(payload, root=0)
+            t1 = clock()
+            req.Wait()
+            times[i] = clock() - t0
+            post_times[i] = t1 - t0
+
+    # Gather per-rank timings (one row per rank) so rank 0 can summarize
+    all_times = np.empty((size, args.reps), dtype=tdtype) if rank == 0 else None
+    comm.Gather(times, all_times, root=0)
+    if mode == "ibcast":
+        all_post = np.empty((size, args.reps), dtype=tdtype) if rank == 0 else None
+        comm.Gather(post_times, all_post, root=0)
+    if mode == "persistent":
+        all_bcast = np.empty((size, args.reps), dtype=tdtype) if rank == 0 else None
+        comm.Gather(bcast_times, all_bcast, root=0)
+
+    if win is not None:
+        win.Free()
+        shm.Free()
 
     if rank == 0:
-        flat = np.concatenate(all_times)
-        med = float(np.median(flat))
-        mn = float(np.min(flat))
-
-        # Rough intuition: broadcast pushes ~payload to (size-1) recipients.
-        eff = (args.mb * max(size - 1, 1)) / med if med > 0 else float("inf")
-
-        print(
-            f"ranks={size} payload_MB={args.mb:.1f} reps={args.reps} "
-            f"median={med:.6f}s min={mn:.6f}s approx_MB_per_s={eff:.1f}"
+        # Per-rep makespan: the collective is done when the slowest rank is done.
+        makespans = np.max(all_times, axis=0) * scale
+        med = float(np.median(makespans))
+        mn = float(np.min(makespans))
+
+        line = (
+            f"ranks={size} mode={mode} payload_MB={args.mb:.1f} reps={args.reps} "
+            f"median={med:.6f}s min={mn:.6f}s"
         )
+        if mode != "shm":
+            # Rough intuition: broadcast pushes ~payload to (size-1) recipients.
+            # (shm moves no payload bytes, so a rate would be meaningless there.)
+            eff = (args.mb * max(size - 1, 1)) / med if med > 0 else float("inf")
+            line += f" approx_MB_per_s={eff:.1f}"
+        if mode == "ibcast":
+            line += f" post_median={float(np.median(np.max(all_post, axis=0) * scale)):.6f}s"
+        if mode == "persistent":
+            line += f" bcast_median={float(np.median(np.max(all_bcast, axis=0) * scale)):.6f}s"
+        print(line)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -11,11 +11,22 @@ This is intentionally simple and easy to read.
 
 What it does
 ------------
-1) Rank 0 creates a payload array of size --mb.
-2) All ranks participate in MPI_Bcast (broadcast the payload).
-3) Each rank does a tiny computation (sum of the first --sum_n elements).
-4) All ranks MPI_Gather the tiny scalar back to rank 0.
-5) Repeat and report median/min timing (single runs are noisy).
+1) Rank 0 creates a payload array of size --mb; every rank pre-touches its copy.
+2) The payload is broadcast ONCE (setup, not timed): the data is constant, so
+   re-sending it every rep would only measure memory traffic.
+3) Timed step, repeated for two message sizes:
+     MPI_Bcast(msg) -> tiny computation (sum of the first --sum_n elements)
+     -> MPI_Gather of the tiny scalar to rank 0 (buffer-mode, no pickle) -> Barrier
+   * small: msg is an 8-byte buffer        => ~alpha (latency / coordination)
+   * large: msg is the full --mb payload   => ~alpha + beta * m (bandwidth)
+4) Report median/min timing for both (single runs are noisy). The difference
+   gives a rough beta (the alpha-beta cost model: T(m) = alpha + beta * m).
+5) Overlapped variant of the large step (double buffering): post
+   MPI_Ibcast into one buffer, do the tiny sum on the *other* buffer (last
+   rep's data) + Gather, then Wait. large_median - overlap_median is the
+   latency hidden behind the compute (needs mpi4py >= 3.0 for Ibcast).
+   Without asynchronous progress in the MPI library this can be ~0 (or even
+   negative): the Ibcast then mostly advances inside Wait.
 
 Why timings can look "weird" on a laptop
 -----------------------------------------
@@ -24,6 +35,9 @@ Why timings can look "weird" on a laptop
 - MPI implementation details (shared-memory fast paths)
 - Allocation / paging effects (first-touch memory)
 
+The tiny sum is JIT-compiled with Numba when available, so its cost is not
+dominated by NumPy call overhead (comparable to the collective being timed).
+
 Run examples
 ------------
 mpirun -np 1 python labs/mpi/python/mpi_overhead_sweep.py --mb 16 --reps 50
@@ -34,11 +48,29 @@ mpirun -np 4 python labs/mpi/python/mpi_overhead_sweep.py --mb 16 --reps 50
 from __future__ import annotations
 
 import argparse
-import time
 
 import numpy as np
 from mpi4py import MPI
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; tiny_sum then falls back to np.sum.
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True)
+    def tiny_sum(buf: np.ndarray, n: int) -> float:
+        """Sum of buf[:n] as a compiled loop (no ufunc dispatch per call)."""
+        s = 0.0
+        for i in range(n):
+            s += buf[i]
+        return s
+else:
+    def tiny_sum(buf: np.ndarray, n: int) -> float:
+        """Sum of buf[:n] (NumPy fallback when Numba is not installed)."""
+        return float(np.sum(buf[:n]))
+
 
 def main() -> None:
     ap = argparse.ArgumentParser()
@@ -60,45 +92,104 @@ def main() -> None:
         payload = np.random.rand(n).astype(np.float64, copy=False)
     else:
         payload = np.empty(n, dtype=np.float64)
+        payload.fill(0.0)  # pre-touch pages so first-touch is not charged to a timed rep
 
     # Clamp sum_n so we never slice past the end
     sum_n = min(max(args.sum_n, 1), payload.size)
 
-    comm.Barrier()
+    # Tiny per-rep result buffers for Gather (preallocated; no pickling).
+    x_buf = np.empty(1, dtype=np.float64)
+    x_all = np.empty(size, dtype=np.float64) if rank == 0 else None
+
+    # Setup: broadcast the (constant) payload once.
+    comm.Bcast(payload, root=0)
+
+    # Warm tiny_sum once so Numba's compile/cache load is not timed as compute.
+    tiny_sum(payload, sum_n)
+
+    # 8-byte message for the latency-only (alpha) measurement.
+    small = np.zeros(1, dtype=np.float64)
+
+    def timed_steps(msg: np.ndarray) -> np.ndarray:
+        """Warmup + timed reps of Bcast(msg) -> tiny sum -> Gather -> Barrier."""
+        comm.Barrier()
+
+        # Warmup
+        for _ in range(args.warmup):
+            comm.Bcast(msg, root=0)
+            x_buf[0] = tiny_sum(payload, sum_n)
+            comm.Gather(x_buf, x_all, root=0)
 
-    times = []
+        comm.Barrier()
+
+        times = np.empty(args.reps, dtype=np.float64)
+
+        # Timed reps
+        for i in range(args.reps):
+            t0 = MPI.Wtime()
 
-    # Warmup
-    for _ in range(args.warmup):
-        comm.Bcast(payload, root=0)
-        _x = float(np.sum(payload[:sum_n]))
-        _ = comm.gather(_x, root=0)
+            comm.Bcast(msg, root=0)
+            x_buf[0] = tiny_sum(payload, sum_n)
+            comm.Gather(x_buf, x_all, root=0)
 
-    comm.Barrier()
+            comm.Barrier()
+            t1 = MPI.Wtime()
+            times[i] = t1 - t0
 
-    # Timed reps
-    for _ in range(args.reps):
-        t0 = time.perf_counter()
+        all_times = np.empty((size, args.reps), dtype=np.float64) if rank == 0 else None
+        comm.Gather(times, all_times, root=0)
+        return all_times
 
-        comm.Bcast(payload, root=0)
-        x = float(np.sum(payload[:sum_n]))
-        _ = comm.gather(x, root=0)
+    # Second payload buffer for the double-buffered (overlapped) variant.
+    payload2 = np.empty_like(payload)
+    payload2[:] = payload
+    bufs = (payload, payload2)
 
+    def timed_overlapped() -> np.ndarray:
+        """Like timed_steps(payload), but the Bcast overlaps the tiny sum."""
         comm.Barrier()
-        t1 = time.perf_counter()
-        times.append(t1 - t0)
 
-    all_times = comm.gather(np.array(times, dtype=np.float64), root=0)
+        times = np.empty(args.reps, dtype=np.float64)
+
+        for i in range(args.warmup + args.reps):
+            t0 = MPI.Wtime()
+
+            # Receive into one buffer while computing on the other.
+            req = comm.Ibcast(bufs[i % 2], root=0)
+            x_buf[0] = tiny_sum(bufs[(i - 1) % 2], sum_n)
+            comm.Gather(x_buf, x_all, root=0)
+            req.Wait()
+
+            comm.Barrier()
+            t1 = MPI.Wtime()
+            if i >= args.warmup:
+                times[i - args.warmup] = t1 - t0
+
+        all_times = np.empty((size, args.reps), dtype=np.float64) if rank == 0 else None
+        comm.Gather(times, all_times, root=0)
+        return all_times
+
+    small_times = timed_steps(small)
+    large_times = timed_steps(payload)
+    overlap_times = timed_overlapped()
 
     if rank == 0:
-        flat = np.concatenate(all_times)
-        med = float(np.median(flat))
-        mn = float(np.min(flat))
+        small_med = float(np.median(small_times))
+        large_med = float(np.median(large_times))
+        mn = float(np.min(large_times))
+        overlap_med = float(np.median(overlap_times))
+
+        # beta ~ extra time per byte for the large message (rough, per step).
+        extra = large_med - small_med
+        mb_per_s = (payload.nbytes / 1e6) / extra if extra > 0 else float("inf")
+
         print(
             f"ranks={size} payload_MB={payload.nbytes/1e6:.3f} reps={args.reps} "
-            f"median={med:.6f}s min={mn:.6f}s"
+            f"small_median={small_med:.6f}s large_median={large_med:.6f}s min={mn:.6f}s "
+            f"approx_beta_MB_per_s={mb_per_s:.1f}\n"
+            f"overlap_median={overlap_med:.6f}s hidden={large_med - overlap_med:.6f}s"
         )
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -13,20 +13,59 @@ Model
 - Ranks 1..(N-1) are workers.
 - Each worker executes TASKS_PER_RANK tasks.
 - Each task has two phases:
-    (A) CPU phase      : time.sleep(--cpu)  [parallel across workers]
-    (B) RESOURCE phase : acquire token -> time.sleep(--res) -> release token
+    (A) CPU phase      : wait(--cpu)  [parallel across workers]
+    (B) RESOURCE phase : acquire token -> wait(--res) -> release token
                          [serialized by number of --slots]
+- wait() is a busy-wait spin on perf_counter by default (--sleep-mode spin):
+  accurate to microseconds and free of OS wake-up latency. time.sleep()
+  (--sleep-mode sleep) typically overshoots by 50-500 us per call, which biases
+  utilization for small --cpu/--res, but leaves cores idle (use it if you run
+  more ranks than cores).
 
 Protocol (simple + robust)
 --------------------------
 Workers send exactly these messages to rank 0:
-- TAG_REQ      : request a token (payload ignored)
+- TAG_REQ      : request a token (payload: tasks remaining, incl. this one)
 - TAG_RELEASE  : release a token (payload: token_id)
-- TAG_DONE     : worker finished; payload is the worker stats dict
+- TAG_DONE     : worker finished (value ignored)
 
 Rank 0 replies with:
 - TAG_GRANT    : token granted (payload: token_id)
 
+All messages carry a 2-element int32 NumPy buffer [tag, value] (uppercase
+Send/Recv, no pickling): the tag is repeated in the payload so the server can
+dispatch on the buffer alone, without an MPI.Status per message. Buffers are
+passed as an explicit [buffer, MPI.INT] spec built once per buffer
+so mpi4py does not have to inspect the array on every call. Per-worker stats are
+one fixed-size NumPy record (STATS_DTYPE), collected once at the end with a
+comm.Gather over a matching MPI struct datatype (no pickling).
+
+Sharded servers: --servers S
+----------------------------
+Ranks 0..S-1 are token servers, each owning a contiguous share of the --slots
+tokens; worker k (rank S+k) talks only to server k % S. This splits the Python
+dispatch load S ways, but a token never moves between shards, so an idle
+token on one server cannot serve a waiter on another.
+
+Server on a thread: --server-thread
+-----------------------------------
+Each server rank also runs a worker; the server loop moves to a background
+thread (needs MPI_THREAD_MULTIPLE), so every rank contributes CPU-phase work.
+GRANTs then travel on a duplicated communicator so the server's ANY_TAG
+receives never match a GRANT addressed to its own rank's worker. The two
+threads share the GIL: with --sleep-mode spin the server only runs at GIL
+switch points (sys.getswitchinterval(), 5 ms by default), so pair it with
+--sleep-mode sleep unless that latency is what you want to show.
+
+Alternative: --protocol rma (no server rank)
+---------------------------------------------
+The pool is a single int64 counter (initially --slots) in an MPI-3 RMA window
+on rank 0, and *every* rank is a worker. Acquire is an atomic
+Fetch_and_op(-1): if the old value was > 0 a slot is ours, otherwise we undo
+it with Fetch_and_op(+1) and retry after a short (exponential) backoff.
+Release is one Fetch_and_op(+1). No Python dispatch loop sits on the critical
+path, but waiting is busy polling and there is no FIFO order (no max_queue).
+
 Run examples (minimum is 2 ranks: server + 1 worker)
 ----------------------------------------------------
 mpirun -np 2 python labs/mpi/python/mpi_shared_resource.py --tasks 50 --cpu 0.01 --res 0.05 --slots 1
@@ -38,44 +77,97 @@ Then increase "accelerators" (slots)
 mpirun -np 8 python labs/mpi/python/mpi_shared_resource.py --tasks 50 --cpu 0.01 --res 0.05 --slots 2
 mpirun -np 8 python labs/mpi/python/mpi_shared_resource.py --tasks 50 --cpu 0.01 --res 0.05 --slots 4
 
+Lock-free token pool instead of a server
+----------------------------------------
+mpirun -np 8 python labs/mpi/python/mpi_shared_resource.py --tasks 50 --cpu 0.01 --res 0.05 --slots 1 --protocol rma
+
+Two sharded token servers
+-------------------------
+mpirun -np 10 python labs/mpi/python/mpi_shared_resource.py --tasks 50 --cpu 0.01 --res 0.05 --slots 4 --servers 2
+
 Try changing:
 - --slots 1 vs 2 vs 4
 - --cpu smaller/larger
 - --res smaller/larger
+- --overlap (request the next token before the CPU phase, hiding queue time)
+- --batch B (B tasks per token acquisition: fewer messages, longer holds)
+- --autotune (probe lambda, pick slots = ceil(lambda * hold) by Little's law)
+- --stagger / --yield-after K (spread the first REQs; back off after K grants)
 """
 
 from __future__ import annotations
 
 import argparse
+import heapq
+import math
+import threading
 import time
-from collections import deque
-from typing import Deque, Dict, Any
+import traceback
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from mpi4py import MPI
 
 
-# Message tags (explicit protocol)
-TAG_REQ = 10       # worker -> server: request token (payload ignored)
-TAG_GRANT = 11     # server -> worker: token granted (payload: int token_id)
-TAG_RELEASE = 12   # worker -> server: release token (payload: int token_id)
-TAG_DONE = 13      # worker -> server: finished all tasks (payload: stats dict)
+# Message tags (explicit protocol); payloads are [tag, value] int32 pairs
+TAG_REQ = 10       # worker -> server: request token (value: tasks remaining)
+TAG_GRANT = 11     # server -> worker: token granted (value: token_id)
+TAG_RELEASE = 12   # worker -> server: release token (value: token_id)
+TAG_DONE = 13      # worker -> server: finished all tasks (value ignored)
 
+# Per-rank stats record, gathered via stats_mpi_type() (server-only ranks send zeros).
+STATS_DTYPE = np.dtype([
+    ("wall", "f8"),
+    ("cpu_time", "f8"),
+    ("res_time", "f8"),
+    ("wait_time", "f8"),
+    ("tasks", "i4"),
+    ("retries", "i4"),  # --protocol rma only: failed acquire attempts
+])
 
-def server_loop(comm: MPI.Comm, slots: int, n_workers: int) -> Dict[str, Any]:
+# --autotune: tasks per worker in the unconstrained probe run.
+AUTOTUNE_PROBE_TASKS = 5
+
+
+def server_loop(
+    comm: MPI.Comm, slots: int, workers: List[int], queue: str = "fifo", first_token: int = 0,
+    reply_comm: Optional[MPI.Comm] = None,
+) -> Dict[str, Any]:
     """
-    Rank 0: token server.
+    Token server (rank 0, or one of ranks 0..S-1 with --servers S) for the
+    worker ranks in `workers`.
 
     Maintains:
-    - available tokens (0..slots-1)
-    - FIFO queue of waiting worker ranks
-    - counts done workers
-    - collects final worker stats dicts (sent with TAG_DONE)
+    - available tokens (first_token..first_token+slots-1)
+    - queue of waiting worker ranks: FIFO, or (queue="remaining") a priority
+      queue that serves the waiter with the most tasks left first, so
+      stragglers catch up and the slowest worker (the makespan) finishes sooner
+    - counts done workers (TAG_DONE)
+
+    One Irecv per worker is kept preposted; each loop iteration takes *all*
+    that have completed (Waitsome), handles and reposts them, so a burst of
+    N messages costs one outer iteration rather than N.
+
+    REQ and RELEASE only update the queue / pool; a single match pass after
+    each drained burst then grants as many waiters as there are free tokens.
 
     Returns:
-      dict with server stats + worker_stats map.
+      dict with server stats.
     """
-    available: Deque[int] = deque(range(slots))  # token IDs available now
-    waiting: Deque[int] = deque()                # worker ranks waiting
+    n_workers = len(workers)
+
+    # Fixed-size int ring buffers (head index + count): no per-op allocation.
+    # The pool never holds more than `slots` tokens and each worker has at
+    # most one REQ outstanding, so neither ring can overflow.
+    available = array("i", range(first_token, first_token + slots))  # token IDs available now
+    a_head, a_count = 0, slots
+    waiting = array("i", [0]) * n_workers  # worker ranks waiting (FIFO)
+    w_head = 0
+    n_wait = 0                                   # waiters queued (FIFO ring or heap)
+    by_remaining = queue == "remaining"
+    heap: List[Tuple[int, int, int]] = []        # (-remaining, arrival seq, rank)
+    seq = 0
     done_workers = 0
 
     # Server-side stats
@@ -83,101 +175,426 @@ def server_loop(comm: MPI.Comm, slots: int, n_workers: int) -> Dict[str, Any]:
     n_releases = 0
     max_queue = 0
 
-    worker_stats: Dict[int, Dict[str, float]] = {}
+    out = np.array([TAG_GRANT, 0], dtype=np.int32)  # GRANT payload [tag, token]
+    out_msg = [out, MPI.INT]
+
+    # Worker rank workers[i] uses bufs[i] / msgs[i] / reqs[i]; each buf is [tag, value].
+    bufs = [np.zeros(2, dtype=np.int32) for _ in range(n_workers)]
+    msgs = [[b, MPI.INT] for b in bufs]
+    reqs = [comm.Irecv(msgs[i], source=workers[i], tag=MPI.ANY_TAG) for i in range(n_workers)]
 
-    status = MPI.Status()
+    # Hot-loop locals: bound methods and constants resolve as fast locals
+    # instead of attribute / global lookups on every message.
+    waitsome = MPI.Request.Waitsome
+    request_null = MPI.REQUEST_NULL
+    irecv = comm.Irecv
+    send = (reply_comm or comm).Send  # GRANTs go out on reply_comm if given
+    any_tag = MPI.ANY_TAG
+    tag_req, tag_release, tag_done, tag_grant = TAG_REQ, TAG_RELEASE, TAG_DONE, TAG_GRANT
+    heappush, heappop = heapq.heappush, heapq.heappop
 
     while done_workers < n_workers:
-        msg = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
-        src = status.Get_source()
-        tag = status.Get_tag()
-
-        if tag == TAG_REQ:
-            # Worker requests a token
-            if available:
-                token = available.popleft()
-                comm.send(token, dest=src, tag=TAG_GRANT)
-                n_grants += 1
-            else:
-                waiting.append(src)
-                if len(waiting) > max_queue:
-                    max_queue = len(waiting)
-
-        elif tag == TAG_RELEASE:
-            # Worker releases a token
-            token = int(msg)
-            n_releases += 1
-
-            # Immediately hand token to next waiter if any; else return to pool.
-            if waiting:
-                nxt = waiting.popleft()
-                comm.send(token, dest=nxt, tag=TAG_GRANT)
-                n_grants += 1
+        # Drain every receive that has completed, then match once.
+        for idx in waitsome(reqs):
+            src = workers[idx]
+            buf = bufs[idx]
+            tag = buf[0]
+
+            if tag == tag_req:
+                # Worker requests a token: queue it; the match pass below grants.
+                if by_remaining:
+                    heappush(heap, (-buf[1], seq, src))
+                    seq += 1
+                else:
+                    waiting[(w_head + n_wait) % n_workers] = src
+                n_wait += 1
+
+            elif tag == tag_release:
+                # Worker releases a token back to the pool.
+                available[(a_head + a_count) % slots] = buf[1]
+                a_count += 1
+                n_releases += 1
+
+            elif tag == tag_done:
+                # Worker finished; it sends nothing else, so do not repost.
+                done_workers += 1
+                reqs[idx] = request_null
+                continue
+
             else:
-                available.append(token)
+                raise RuntimeError(f"Unknown tag received by server: {tag} from rank {src}")
 
-        elif tag == TAG_DONE:
-            # Worker finished; msg is the worker's final stats dict
-            worker_stats[src] = msg
-            done_workers += 1
+            reqs[idx] = irecv(msgs[idx], src, any_tag)
 
-        else:
-            raise RuntimeError(f"Unknown tag received by server: {tag} from rank {src}")
+        # Match pass: pair every waiter with a free token, so K free tokens
+        # grant K waiters in one go instead of one per received message.
+        while a_count and n_wait:
+            if by_remaining:
+                nxt = heappop(heap)[2]
+            else:
+                nxt = waiting[w_head]
+                w_head = (w_head + 1) % n_workers
+            n_wait -= 1
+            out[1] = available[a_head]
+            a_head = (a_head + 1) % slots
+            a_count -= 1
+            send(out_msg, nxt, tag_grant)
+            n_grants += 1
+        if n_wait > max_queue:
+            max_queue = n_wait
 
     return {
         "n_grants": n_grants,
         "n_releases": n_releases,
         "max_queue": max_queue,
-        "worker_stats": worker_stats,
     }
 
 
-def worker_run(comm: MPI.Comm, tasks: int, cpu_s: float, res_s: float) -> None:
+def spin(seconds: float) -> None:
+    """Busy-wait for `seconds` (burns CPU like real work; no scheduler wake-up)."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def skip(seconds: float) -> None:
+    """Phase of length 0: return at once (time.sleep(0) would still yield)."""
+
+
+def post_request(comm: MPI.Comm, req_send: MPI.Prequest, tok_msg: list, server: int = 0) -> MPI.Request:
     """
-    Worker ranks (rank != 0): execute tasks and send final stats to server.
+    Nonblocking token request: post the GRANT receive (into tok_msg), then
+    start the persistent REQ send. Returns the GRANT receive request.
+    """
+    grant = comm.Irecv(tok_msg, source=server, tag=TAG_GRANT)
+    req_send.Start()
+    return grant
+
+
+def worker_run(
+    comm: MPI.Comm,
+    tasks: int,
+    cpu_s: float,
+    res_s: float,
+    overlap: bool = False,
+    batch: int = 1,
+    pause: Callable[[float], None] = spin,
+    server: int = 0,
+    stagger_s: float = 0.0,
+    yield_after: int = 0,
+    reply_comm: Optional[MPI.Comm] = None,
+) -> np.ndarray:
+    """
+    Worker ranks: execute tasks against token server rank `server`, tell the
+    server we are done, and return the 1-record STATS_DTYPE stats array
+    (collected by gather_stats).
+
+    REQ and RELEASE are persistent sends (Send_init once, Start per task). The
+    RELEASE is not waited for until the next task needs its buffer, so the
+    worker goes straight on to the next CPU phase while it is in flight.
+
+    With overlap=True, the request for task k+1 is sent right after releasing
+    token k, so the server can queue it while the worker runs the CPU phase of
+    task k+1. wait_time then only counts the time actually blocked on the grant.
+    (Trade-off: a grant that arrives during the CPU phase holds the token idle.)
+    Together with the in-flight RELEASE this is a two-stage software pipeline:
+
+        prologue : REQ_0                    (GRANT_0 Irecv posted first)
+        task k   : CPU_k | Wait(GRANT_k) | RES_k | Start(RELEASE_k), REQ_k+1
+        epilogue : Wait(RELEASE_last)
+
+    so REQ_k+1 and RELEASE_k are both outstanding during CPU_k+1.
+
+    With batch=B > 1, tasks are processed B at a time: the CPU phases of the
+    batch run first, then ONE token acquisition covers the B resource phases,
+    followed by one RELEASE. This cuts control messages (and server loop
+    iterations) by a factor of B, at the cost of longer token holds.
+
+    Anti-herd knobs (both off by default): stagger_s delays the first task so
+    workers do not all send their first REQ at once, and yield_after=K pauses
+    for res_s/2 after every K acquisitions before asking again, giving other
+    waiters a chance when one worker keeps winning the token.
     """
-    rank = comm.Get_rank()
 
     total_wait = 0.0
     total_cpu = 0.0
     total_res = 0.0
+    acquired = 0
+
+    # [tag, value] message buffers: REQ (tasks remaining), GRANT and RELEASE
+    # token. Separate buffers so a pending send never aliases a pending GRANT recv.
+    req_buf = np.array([TAG_REQ, 0], dtype=np.int32)
+    tok_buf = np.zeros(2, dtype=np.int32)
+    rel_buf = np.array([TAG_RELEASE, 0], dtype=np.int32)
+    req_msg = [req_buf, MPI.INT]
+    tok_msg = [tok_buf, MPI.INT]
+    rel_msg = [rel_buf, MPI.INT]
+
+    # Persistent sends: argument setup is paid once, each task just Starts them.
+    req_send = comm.Send_init(req_msg, dest=server, tag=TAG_REQ)
+    rel_send = comm.Send_init(rel_msg, dest=server, tag=TAG_RELEASE)
+    grants = reply_comm or comm  # GRANTs arrive here (see server_loop)
+
+    # Phase callables chosen once: a zero-length phase costs no branch per task.
+    cpu_pause = pause if cpu_s > 0 else skip
+    res_pause = pause if res_s > 0 else skip
 
     t_start = time.perf_counter()
+    if stagger_s > 0:
+        pause(stagger_s)
+
+    # Outstanding GRANT receive, posted ahead of the CPU phase.
+    # REQ carries the number of tasks still to do (incl. the requested one).
+    grant = None
+    if overlap:
+        req_buf[1] = tasks
+        grant = post_request(grants, req_send, tok_msg, server)
+
+    for i in range(0, tasks, batch):
+        n = min(batch, tasks - i)  # tasks in this batch
 
-    for _ in range(tasks):
         # (A) CPU phase (parallel)
-        if cpu_s > 0:
-            t0 = time.perf_counter()
-            time.sleep(cpu_s)
-            total_cpu += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cpu_pause(n * cpu_s)
+        total_cpu += time.perf_counter() - t0
 
         # (B) RESOURCE phase (serialized by tokens)
-        comm.send(None, dest=0, tag=TAG_REQ)
+        if grant is None:
+            # GRANT Irecv goes up before the REQ, so the reply never lands
+            # in MPI's unexpected-message queue.
+            req_buf[1] = tasks - i
+            grant = post_request(grants, req_send, tok_msg, server)
 
         w0 = time.perf_counter()
-        token = comm.recv(source=0, tag=TAG_GRANT)  # blocks until granted
+        grant.Wait()  # blocks until granted
         total_wait += time.perf_counter() - w0
+        req_send.Wait()  # already delivered: the server answered it
 
         r0 = time.perf_counter()
-        if res_s > 0:
-            time.sleep(res_s)
+        res_pause(n * res_s)
         total_res += time.perf_counter() - r0
 
-        comm.send(int(token), dest=0, tag=TAG_RELEASE)
+        # Previous RELEASE must be out before rel_buf is reused.
+        rel_send.Wait()
+        rel_buf[1] = tok_buf[1]
+        rel_send.Start()
+
+        acquired += 1
+        if yield_after and acquired % yield_after == 0 and i + n < tasks:
+            pause(res_s / 2)
+
+        grant = None
+        if overlap and i + n < tasks:
+            req_buf[1] = tasks - i - n
+            grant = post_request(grants, req_send, tok_msg, server)
+
+    rel_send.Wait()
+    req_send.Free()
+    rel_send.Free()
 
     wall = time.perf_counter() - t_start
 
-    stats = {
-        "rank": float(rank),
-        "tasks": float(tasks),
-        "wall": wall,
-        "cpu_time": total_cpu,
-        "res_time": total_res,
-        "wait_time": total_wait,
-    }
+    stats = np.zeros(1, dtype=STATS_DTYPE)
+    stats[0] = (wall, total_cpu, total_res, total_wait, tasks, 0)
+
+    # One message at the end: "I'm done"
+    req_buf[0] = TAG_DONE
+    comm.Send(req_msg, dest=server, tag=TAG_DONE)
+    return stats
+
+
+def rma_worker_run(
+    comm: MPI.Comm, tasks: int, cpu_s: float, res_s: float, slots: int,
+    pause: Callable[[float], None] = spin,
+) -> np.ndarray:
+    """
+    --protocol rma: every rank is a worker; tokens are a shared atomic counter
+    (int64 in an RMA window on rank 0) instead of messages to a server.
+
+    Collective: all ranks must call it. Returns the 1-record STATS_DTYPE
+    array (with "retries": failed acquire attempts).
+    """
+    rank = comm.Get_rank()
+
+    win = MPI.Win.Allocate(8 if rank == 0 else 0, 8, comm=comm)
+    # Initialize inside the passive-target epoch: the local store is made
+    # visible to remote atomics by Win.Sync, and the Barrier orders it before
+    # any rank's first Fetch_and_op (separate memory model safe).
+    win.Lock_all(MPI.MODE_NOCHECK)
+    if rank == 0:
+        np.frombuffer(win.tomemory(), dtype=np.int64)[0] = slots
+    win.Sync()
+    comm.Barrier()
 
-    # One message at the end: "I'm done and here are my stats"
-    comm.send(stats, dest=0, tag=TAG_DONE)
+    take = np.array([-1], dtype=np.int64)
+    give = np.array([1], dtype=np.int64)
+    old = np.zeros(1, dtype=np.int64)
+    max_backoff = max(res_s / 4, 1e-4)
+    cpu_pause = pause if cpu_s > 0 else skip
+    res_pause = pause if res_s > 0 else skip
+
+    total_wait = 0.0
+    total_cpu = 0.0
+    total_res = 0.0
+    retries = 0
+
+    t_start = time.perf_counter()
+
+    for _ in range(tasks):
+        # (A) CPU phase (parallel)
+        t0 = time.perf_counter()
+        cpu_pause(cpu_s)
+        total_cpu += time.perf_counter() - t0
+
+        # (B) RESOURCE phase: atomically claim a slot, retry with backoff.
+        w0 = time.perf_counter()
+        backoff = 1e-6
+        while True:
+            win.Fetch_and_op(take, old, 0, 0, MPI.SUM)
+            win.Flush(0)
+            if old[0] > 0:
+                break
+            win.Fetch_and_op(give, old, 0, 0, MPI.SUM)  # undo the claim
+            win.Flush(0)
+            retries += 1
+            time.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+        total_wait += time.perf_counter() - w0
+
+        r0 = time.perf_counter()
+        res_pause(res_s)
+        total_res += time.perf_counter() - r0
+
+        win.Fetch_and_op(give, old, 0, 0, MPI.SUM)
+        win.Flush(0)
+
+    wall = time.perf_counter() - t_start
+    win.Unlock_all()
+    comm.Barrier()
+    win.Free()
+
+    stats = np.zeros(1, dtype=STATS_DTYPE)
+    stats[0] = (wall, total_cpu, total_res, total_wait, tasks, retries)
+    return stats
+
+
+def stats_mpi_type() -> MPI.Datatype:
+    """
+    Committed MPI struct type matching one STATS_DTYPE record: field offsets
+    come from the NumPy dtype, and the extent is resized to its itemsize so
+    consecutive records line up. Caller must Free() it.
+    """
+    mpi_of = {np.dtype("f8"): MPI.DOUBLE, np.dtype("i4"): MPI.INT}
+    fields = [STATS_DTYPE.fields[name] for name in STATS_DTYPE.names]
+    struct = MPI.Datatype.Create_struct(
+        [1] * len(fields), [off for _, off in fields], [mpi_of[dt] for dt, _ in fields]
+    )
+    dtype = struct.Create_resized(0, STATS_DTYPE.itemsize).Commit()
+    struct.Free()
+    return dtype
+
+
+def gather_stats(comm: MPI.Comm, stats: np.ndarray) -> np.ndarray:
+    """Gather every rank's 1-record stats array on rank 0 (None elsewhere)."""
+    dtype = stats_mpi_type()
+    recv = np.empty(comm.Get_size(), dtype=STATS_DTYPE) if comm.Get_rank() == 0 else None
+    comm.Gather([stats, 1, dtype], [recv, 1, dtype] if recv is not None else None, root=0)
+    dtype.Free()
+    return recv
+
+
+def summarize(workers: np.ndarray, slots: int) -> tuple:
+    """(makespan, total_wait, total_res, util) over the worker stats records."""
+    # Makespan is governed by the slowest worker (MPI-style completion time)
+    makespan = float(workers["wall"].max()) if len(workers) else 0.0
+
+    total_wait = float(workers["wait_time"].sum())
+    total_res = float(workers["res_time"].sum())
+
+    # Utilization of the scarce resource (rough but intuitive):
+    # total time spent "in resource" / (capacity * makespan)
+    util = (total_res / (slots * makespan)) if makespan > 0 else 0.0
+    return makespan, total_wait, total_res, util
+
+
+def run_server_protocol(
+    comm: MPI.Comm, args: argparse.Namespace, tasks: int, slots: int, batch: int,
+    pause: Callable[[float], None],
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    One --protocol server run with `tasks` per worker and `slots` tokens
+    (collective). Returns (worker stats records, [server_wall, max_queue]
+    maxed over servers) on rank 0, None elsewhere.
+    """
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    n_servers = args.servers
+    # With --server-thread every rank is a worker and servers run on a thread.
+    first_worker = 0 if args.server_thread else n_servers
+    n_workers = size - first_worker
+    reply_comm = comm
+    if args.server_thread:
+        # GRANTs travel on their own communicator: a server thread's ANY_TAG
+        # receive from its own rank must not match the GRANT for its worker.
+        reply_comm = comm.Dup()
+
+    is_server = rank < n_servers
+    is_worker = rank >= first_worker
+
+    srv: Dict[str, Any] = {}
+    if is_server:
+        # Server s owns a contiguous share of the tokens and serves the
+        # workers that hash to it (worker index % n_servers == s).
+        share, extra = divmod(slots, n_servers)
+        local_slots = share + (rank < extra)
+        first_token = rank * share + min(rank, extra)
+        my_workers = list(range(first_worker + rank, size, n_servers))
+
+        def run_server() -> None:
+            t0 = time.perf_counter()
+            srv.update(server_loop(
+                comm, slots=local_slots, workers=my_workers, queue=args.queue,
+                first_token=first_token, reply_comm=reply_comm,
+            ))
+            srv["wall"] = time.perf_counter() - t0
+
+        def run_server_thread() -> None:
+            # An exception here would otherwise leave this rank's worker (and
+            # every other rank) blocked forever waiting for grants.
+            try:
+                run_server()
+            except BaseException:
+                traceback.print_exc()
+                comm.Abort(1)
+
+        if is_worker:
+            server_thread = threading.Thread(target=run_server_thread, name="token-server")
+            server_thread.start()
+        else:
+            run_server()
+
+    stats = np.zeros(1, dtype=STATS_DTYPE)
+    if is_worker:
+        k = rank - first_worker
+        stats = worker_run(
+            comm, tasks=tasks, cpu_s=args.cpu, res_s=args.res, overlap=args.overlap, batch=batch,
+            pause=pause, server=k % n_servers,
+            stagger_s=k * args.res / n_workers if args.stagger else 0.0,
+            yield_after=args.yield_after, reply_comm=reply_comm,
+        )
+    if is_server and is_worker:
+        server_thread.join()
+
+    workers = gather_stats(comm, stats)
+    # Slowest server and deepest queue over all shards.
+    srv_buf = np.array([srv.get("wall", 0.0), srv.get("max_queue", 0)], dtype=np.float64)
+    srv_max = np.empty_like(srv_buf) if rank == 0 else None
+    comm.Reduce([srv_buf, MPI.DOUBLE], [srv_max, MPI.DOUBLE] if rank == 0 else None, op=MPI.MAX, root=0)
+    if reply_comm is not comm:
+        reply_comm.Free()
+    if rank != 0:
+        return None
+    return workers[first_worker:], srv_max
 
 
 def main() -> None:
@@ -186,6 +603,27 @@ def main() -> None:
     ap.add_argument("--cpu", type=float, default=0.01, help="seconds CPU phase per task")
     ap.add_argument("--res", type=float, default=0.05, help="seconds shared-resource phase per task")
     ap.add_argument("--slots", type=int, default=1, help="number of shared resource slots (tokens)")
+    ap.add_argument("--overlap", action="store_true",
+                    help="send the next token request before the CPU phase (overlap request with CPU work)")
+    ap.add_argument("--sleep-mode", choices=("spin", "sleep"), default="spin",
+                    help="how workers spend --cpu/--res: busy-wait (accurate) or time.sleep (yields the core)")
+    ap.add_argument("--batch", type=int, default=1,
+                    help="tasks per token acquisition (0 = auto: ceil(cpu/res)); amortizes REQ/GRANT/RELEASE")
+    ap.add_argument("--queue", choices=("fifo", "remaining"), default="fifo",
+                    help="server wait queue: FIFO, or most tasks remaining first (helps stragglers)")
+    ap.add_argument("--protocol", choices=("server", "rma"), default="server",
+                    help="token server on rank 0, or lock-free RMA counter with every rank a worker")
+    ap.add_argument("--autotune", action="store_true",
+                    help=f"probe {AUTOTUNE_PROBE_TASKS} tasks/worker with unlimited tokens, "
+                         "then run the rest with slots=ceil(lambda*hold) (Little's law)")
+    ap.add_argument("--stagger", action="store_true",
+                    help="delay worker k's first task by k*res/workers (avoids a REQ burst at start)")
+    ap.add_argument("--yield-after", type=int, default=0, metavar="K",
+                    help="pause res/2 after every K token acquisitions (0 = never); fairness when slots=1")
+    ap.add_argument("--servers", type=int, default=1,
+                    help="token servers (ranks 0..S-1), each owning slots/S tokens for its share of workers")
+    ap.add_argument("--server-thread", action="store_true",
+                    help="run each token server on a thread so its rank is a worker too (needs MPI_THREAD_MULTIPLE)")
     args = ap.parse_args()
 
     if args.tasks < 1:
@@ -194,41 +632,115 @@ def main() -> None:
         raise SystemExit("--slots must be >= 1")
     if args.cpu < 0 or args.res < 0:
         raise SystemExit("--cpu and --res must be >= 0")
+    if args.batch < 0:
+        raise SystemExit("--batch must be >= 0")
+    if args.yield_after < 0:
+        raise SystemExit("--yield-after must be >= 0")
+    if args.protocol == "rma" and (
+        args.overlap or args.batch != 1 or args.servers != 1 or args.stagger or args.yield_after
+        or args.server_thread or args.queue != "fifo"
+    ):
+        raise SystemExit(
+            "--overlap, --batch, --queue, --servers, --server-thread, --stagger and --yield-after "
+            "apply only to --protocol server"
+        )
+    if args.autotune and (args.protocol == "rma" or args.tasks <= AUTOTUNE_PROBE_TASKS):
+        raise SystemExit(f"--autotune needs --protocol server and --tasks > {AUTOTUNE_PROBE_TASKS}")
+    if not 1 <= args.servers <= args.slots:
+        raise SystemExit("--servers must be between 1 and --slots (each server needs a token)")
+
+    # Auto batch: enough tasks per grant that control messages stop being a
+    # noticeable fraction of each hold (never more than the task count).
+    if args.batch == 0:
+        args.batch = math.ceil(args.cpu / args.res) if args.res > 0 else args.tasks
+    batch = max(1, min(args.batch, args.tasks))
+    pause = spin if args.sleep_mode == "spin" else time.sleep
 
     comm = MPI.COMM_WORLD
     rank = comm.Get_rank()
     size = comm.Get_size()
 
-    if size < 2:
-        raise SystemExit("Run with at least 2 ranks (server rank 0 + >=1 worker).")
-
-    if rank == 0:
-        t0 = time.perf_counter()
-        stats = server_loop(comm, slots=args.slots, n_workers=size - 1)
-        server_wall = time.perf_counter() - t0
-
-        workers = list(stats["worker_stats"].values())
-
-        # Makespan is governed by the slowest worker (MPI-style completion time)
-        makespan = max(w["wall"] for w in workers) if workers else 0.0
-
-        total_wait = sum(w["wait_time"] for w in workers)
-        total_res = sum(w["res_time"] for w in workers)
-
-        # Utilization of the scarce resource (rough but intuitive):
-        # total time spent "in resource" / (capacity * makespan)
-        util = (total_res / (args.slots * makespan)) if makespan > 0 else 0.0
-
-        print(
-            f"ranks={size} workers={size-1} slots={args.slots} "
-            f"tasks_per_rank={args.tasks} cpu={args.cpu:.3f}s res={args.res:.3f}s\n"
-            f"makespan_worker_max={makespan:.4f}s  server_wall={server_wall:.4f}s\n"
-            f"total_wait={total_wait:.4f}s  total_res={total_res:.4f}s  "
-            f"resource_util~={util*100:.1f}%  max_queue={stats['max_queue']}"
+    if args.protocol == "rma":
+        stats = rma_worker_run(
+            comm, tasks=args.tasks, cpu_s=args.cpu, res_s=args.res, slots=args.slots, pause=pause
         )
-
-    else:
-        worker_run(comm, tasks=args.tasks, cpu_s=args.cpu, res_s=args.res)
+        workers = gather_stats(comm, stats)
+        if rank == 0:
+            makespan, total_wait, total_res, util = summarize(workers, args.slots)
+            retries = int(workers["retries"].sum())
+            print(
+                f"ranks={size} workers={size} slots={args.slots} protocol=rma "
+                f"tasks_per_rank={args.tasks} cpu={args.cpu:.3f}s res={args.res:.3f}s\n"
+                f"makespan_worker_max={makespan:.4f}s  acquire_retries={retries}\n"
+                f"total_wait={total_wait:.4f}s  total_res={total_res:.4f}s  "
+                f"resource_util~={util*100:.1f}%"
+            )
+        return
+
+    n_servers = args.servers
+    first_worker = 0 if args.server_thread else n_servers
+    n_workers = size - first_worker
+    # Every server needs at least one worker, or its token share is never used.
+    if args.server_thread and size < n_servers:
+        raise SystemExit(f"Run with at least {n_servers} ranks (one per --server-thread server).")
+    if n_workers < n_servers:
+        raise SystemExit(
+            f"Run with at least {2 * n_servers} ranks ({n_servers} server(s) + >=1 worker per server)."
+        )
+    if args.server_thread and MPI.Query_thread() < MPI.THREAD_MULTIPLE:
+        raise SystemExit("--server-thread needs an MPI library with MPI_THREAD_MULTIPLE")
+
+    slots = args.slots
+    tasks = args.tasks
+    acq_per_worker = math.ceil(tasks / batch)
+    if args.autotune:
+        # Probe: a few tasks per worker with a token for every worker (no
+        # queueing), to measure the unconstrained acquisition rate lambda.
+        probe_tasks = AUTOTUNE_PROBE_TASKS
+        probe_batch = min(batch, probe_tasks)
+        probe = run_server_protocol(
+            comm, args, tasks=probe_tasks, slots=max(n_workers, n_servers), batch=probe_batch, pause=pause
+        )
+        tuned = np.zeros(1, dtype=np.int32)
+        if rank == 0:
+            p_workers, _ = probe
+            p_makespan = float(p_workers["wall"].max())
+            lam = n_workers * math.ceil(probe_tasks / probe_batch) / p_makespan if p_makespan > 0 else 0.0
+            hold = probe_batch * args.res
+            # Little's law on the resource: slots busy on average = lambda * hold.
+            tuned[0] = max(n_servers, math.ceil(lam * hold), 1)
+            print(
+                f"autotune: probe tasks_per_rank={probe_tasks} lambda={lam:.1f}/s hold={hold:.4f}s "
+                f"-> slots={int(tuned[0])} (was {args.slots})"
+            )
+        comm.Bcast([tuned, MPI.INT], root=0)
+        slots = int(tuned[0])
+        tasks -= probe_tasks
+        acq_per_worker = math.ceil(tasks / batch)
+
+    result = run_server_protocol(comm, args, tasks=tasks, slots=slots, batch=batch, pause=pause)
+    if rank != 0:
+        return
+    workers, srv_max = result
+    makespan, total_wait, total_res, util = summarize(workers, slots)
+
+    # Little's law for the token queue: L = lambda * W, with lambda the
+    # acquisition rate and W the mean wait per acquisition.
+    n_acq = n_workers * acq_per_worker
+    lam = n_acq / makespan if makespan > 0 else 0.0
+    w_mean = total_wait / n_acq
+    hold = total_res / n_acq
+
+    print(
+        f"ranks={size} servers={n_servers}{' (threaded)' if args.server_thread else ''} "
+        f"workers={n_workers} slots={slots} queue={args.queue} batch={batch} "
+        f"tasks_per_rank={tasks} cpu={args.cpu:.3f}s res={args.res:.3f}s\n"
+        f"makespan_worker_max={makespan:.4f}s  server_wall={srv_max[0]:.4f}s\n"
+        f"total_wait={total_wait:.4f}s  total_res={total_res:.4f}s  "
+        f"resource_util~={util*100:.1f}%  max_queue={int(srv_max[1])}\n"
+        f"little: lambda={lam:.1f}/s  W={w_mean*1e3:.3f}ms  L_pred=lambda*W={lam*w_mean:.2f}  "
+        f"busy_slots=lambda*hold={lam*hold:.2f}"
+    )
 
 
 if __name__ == "__main__":